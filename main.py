@@ -1,41 +1,126 @@
 import os
-from fastapi import FastAPI, HTTPException, Query
-from fastapi.middleware.cors import CORSMiddleware
+import asyncio
+import logging
+from contextlib import asynccontextmanager
+import orjson
+from bson import ObjectId, json_util
+from cachetools import TTLCache
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from pydantic import BaseModel, EmailStr
 from typing import Dict, Any, List, Optional
 from datetime import datetime
 
 from schemas import ALL_SCHEMAS, Master, Client, Booking
-from database import create_document, get_documents
+from database import init_db, close_db, create_document, create_documents, delete_document, get_documents, iter_documents, ensure_indexes
 
-app = FastAPI(title="BeautyConnect API")
+logger = logging.getLogger(__name__)
 
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+async def _build_indexes():
+    try:
+        await ensure_indexes()
+    except Exception as e:
+        # Keep serving; reads still work without the indexes
+        logger.warning("Could not create indexes: %s", e)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    app.state.db = init_db()
+    # Run in the background so an unreachable Mongo never delays startup
+    index_task = asyncio.create_task(_build_indexes())
+    yield
+    index_task.cancel()
+    close_db()
+
+app = FastAPI(title="BeautyConnect API", default_response_class=ORJSONResponse, lifespan=lifespan)
+
+_CORS_PREFLIGHT_HEADERS = [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-max-age", b"600"),
+]
+
+
+class StaticCORSMiddleware:
+    """Allow any origin with credentials, like CORSMiddleware with "*" everywhere.
+
+    Requests without an Origin header pass straight through; cross-origin
+    ones get the caller's origin echoed back next to fixed header values.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        origin = request_method = request_headers = None
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                request_method = value
+            elif name == b"access-control-request-headers":
+                request_headers = value
+        if origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        cors_headers = [
+            (b"access-control-allow-origin", origin),
+            (b"access-control-allow-credentials", b"true"),
+            (b"vary", b"Origin"),
+        ]
+
+        if scope["method"] == "OPTIONS" and request_method is not None:
+            headers = cors_headers + _CORS_PREFLIGHT_HEADERS
+            if request_headers is not None:
+                headers.append((b"access-control-allow-headers", request_headers))
+            await send({"type": "http.response.start", "status": 204, "headers": headers})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        async def send_with_cors(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + cors_headers
+            await send(message)
+
+        await self.app(scope, receive, send_with_cors)
+
+
+app.add_middleware(StaticCORSMiddleware)
+# List payloads repeat the same keys and URL prefixes and compress well
+app.add_middleware(GZipMiddleware, minimum_size=512, compresslevel=5)
+
+# Static bodies for the health-check style endpoints
+_ROOT_BYTES = orjson.dumps({"message": "BeautyConnect backend is running"})
+_HELLO_BYTES = orjson.dumps({"message": "Hello from the backend API!"})
 
 @app.get("/")
-def read_root():
-    return {"message": "BeautyConnect backend is running"}
+async def read_root():
+    return Response(content=_ROOT_BYTES, media_type="application/json")
 
 @app.get("/api/hello")
-def hello():
-    return {"message": "Hello from the backend API!"}
+async def hello():
+    return Response(content=_HELLO_BYTES, media_type="application/json")
+
+# Schemas are fixed for the lifetime of the process, so build and encode them once
+_SCHEMA_CACHE: Dict[str, Dict[str, Any]] = {
+    name: model.model_json_schema() for name, model in ALL_SCHEMAS.items()
+}
+_SCHEMA_BYTES = orjson.dumps(_SCHEMA_CACHE)
 
 @app.get("/schema")
-def get_schema():
+async def get_schema():
     """Expose declared Pydantic models so DB viewer can use them."""
-    out: Dict[str, Dict[str, Any]] = {}
-    for name, model in ALL_SCHEMAS.items():
-        out[name] = model.model_json_schema()
-    return out
+    return Response(content=_SCHEMA_BYTES, media_type="application/json")
 
 @app.get("/test")
-def test_database():
+async def test_database(request: Request):
     """Test endpoint to check if database is available and accessible"""
     response = {
         "backend": "✅ Running",
@@ -46,14 +131,14 @@ def test_database():
         "collections": []
     }
     try:
-        from database import db
+        db = request.app.state.db
         if db is not None:
             response["database"] = "✅ Available"
             response["database_url"] = "✅ Set" if os.getenv("DATABASE_URL") else "❌ Not Set"
             response["database_name"] = getattr(db, 'name', None) or os.getenv("DATABASE_NAME") or "Unknown"
             response["connection_status"] = "Connected"
             try:
-                collections = db.list_collection_names()
+                collections = await db.list_collection_names()
                 response["collections"] = collections[:10]
                 response["database"] = "✅ Connected & Working"
             except Exception as e:
@@ -62,7 +147,7 @@ def test_database():
             response["database"] = "⚠️ Available but not initialized"
     except Exception as e:
         response["database"] = f"❌ Error: {str(e)[:80]}"
-    return response
+    return ORJSONResponse(response)
 
 # ---------------------
 # Masters API
@@ -79,47 +164,98 @@ class MasterOut(BaseModel):
     verified: bool = False
 
 
-def _serialize_master(doc: dict) -> MasterOut:
-    return MasterOut(
-        id=str(doc.get("_id")),
-        name=doc.get("name", ""),
-        role=(doc.get("skills") or [None])[0],
-        rating=float(doc.get("rating", 0)),
-        reviews_count=int(doc.get("reviews_count", 0)),
-        city=doc.get("city"),
-        avatar=doc.get("avatar"),
-        verified=bool(doc.get("verified", False)),
+# MasterOut field -> expression over the raw document `d`
+_MASTER_FIELD_EXPRS = {
+    "id": '_str(d.get("_id"))',
+    "name": 'd.get("name", "")',
+    "role": '(d.get("skills") or _no_skills)[0]',
+    "rating": '_float(d.get("rating", 0))',
+    "reviews_count": '_int(d.get("reviews_count", 0))',
+    "city": 'd.get("city")',
+    "avatar": 'd.get("avatar")',
+    "verified": '_bool(d.get("verified", False))',
+}
+assert list(_MASTER_FIELD_EXPRS) == list(MasterOut.model_fields)
+
+
+def _build_master_serializer():
+    """Generate a flat dict-literal function so each call is one frame with no loops"""
+    body = ", ".join(f"{k!r}: {expr}" for k, expr in _MASTER_FIELD_EXPRS.items())
+    src = (
+        "def _serialize_master(d, _str=str, _float=float, _int=int, _bool=bool, _no_skills=(None,)):\n"
+        f"    return {{{body}}}\n"
     )
+    namespace: Dict[str, Any] = {}
+    exec(compile(src, "<_serialize_master>", "exec"), namespace)
+    return namespace["_serialize_master"]
 
-@app.get("/api/masters", response_model=List[MasterOut])
-def list_masters(city: Optional[str] = Query(default=None, description="Filter by city"), limit: int = Query(default=12, ge=1, le=100)):
-    filter_q = {}
-    if city:
-        filter_q["city"] = city
-    try:
-        docs = get_documents("master", filter_q, limit=limit)
-        return [_serialize_master(d) for d in docs]
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
+# Documents come from our own collection, so build MasterOut-shaped dicts
+# directly instead of validating
+_serialize_master = _build_master_serializer()
+
+# Only the fields _serialize_master reads
+_MASTER_PROJECTION = {
+    "name": 1,
+    "skills": 1,
+    "rating": 1,
+    "reviews_count": 1,
+    "city": 1,
+    "avatar": 1,
+    "verified": 1,
+}
+
+# Serialized /api/masters bodies keyed by (city, limit); cleared on writes
+_masters_cache: TTLCache = TTLCache(maxsize=256, ttl=30)
+# Bumped on every clear so a fill that raced a write doesn't store stale data
+_masters_cache_generation = 0
+
+
+def _invalidate_masters_cache() -> None:
+    global _masters_cache_generation
+    _masters_cache_generation += 1
+    _masters_cache.clear()
+
+@app.get("/api/masters", responses={200: {"model": List[MasterOut]}})
+async def list_masters(city: Optional[str] = Query(default=None, description="Filter by city"), limit: int = Query(default=12, ge=1, le=100)):
+    key = (city, limit)
+    body = _masters_cache.get(key)
+    if body is None:
+        generation = _masters_cache_generation
+        filter_q = {}
+        if city:
+            filter_q["city"] = city
+        try:
+            docs = await get_documents("master", filter_q, limit=limit, projection=_MASTER_PROJECTION)
+            body = orjson.dumps([_serialize_master(d) for d in docs])
+        except Exception as e:
+            raise HTTPException(status_code=500, detail=str(e))
+        if generation == _masters_cache_generation:
+            _masters_cache[key] = body
+    return Response(content=body, media_type="application/json")
 
 @app.post("/api/masters", status_code=201)
-def create_master(master: Master):
+async def create_master(master: Master):
     try:
-        new_id = create_document("master", master)
+        new_id = await create_document("master", master)
+        _invalidate_masters_cache()
         return {"id": new_id}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Demo data for the seed endpoint, validated and dumped once at import
+_SEED_SAMPLE = [
+    Master(name="Анна Петрова", city="Москва", skills=["Визажист"], rating=4.9, reviews_count=182, avatar="https://images.unsplash.com/photo-1527980965255-d3b416303d12?q=80&w=300&auto=format&fit=crop"),
+    Master(name="Ирина Смирнова", city="Санкт-Петербург", skills=["Мастер маникюра"], rating=4.8, reviews_count=240, avatar="https://images.unsplash.com/photo-1544005313-94ddf0286df2?q=80&w=300&auto=format&fit=crop"),
+    Master(name="Мария Иванова", city="Казань", skills=["Парикмахер-стилист"], rating=5.0, reviews_count=320, avatar="https://images.unsplash.com/photo-1502685104226-ee32379fefbe?q=80&w=300&auto=format&fit=crop"),
+]
+_SEED_DUMPS = [m.model_dump(mode="json") for m in _SEED_SAMPLE]
+
 # Simple seed endpoint for demo purposes
 @app.post("/api/seed", tags=["dev"])
-def seed_demo_data():
-    sample = [
-        Master(name="Анна Петрова", city="Москва", skills=["Визажист"], rating=4.9, reviews_count=182, avatar="https://images.unsplash.com/photo-1527980965255-d3b416303d12?q=80&w=300&auto=format&fit=crop"),
-        Master(name="Ирина Смирнова", city="Санкт-Петербург", skills=["Мастер маникюра"], rating=4.8, reviews_count=240, avatar="https://images.unsplash.com/photo-1544005313-94ddf0286df2?q=80&w=300&auto=format&fit=crop"),
-        Master(name="Мария Иванова", city="Казань", skills=["Парикмахер-стилист"], rating=5.0, reviews_count=320, avatar="https://images.unsplash.com/photo-1502685104226-ee32379fefbe?q=80&w=300&auto=format&fit=crop"),
-    ]
+async def seed_demo_data():
     try:
-        ids = [create_document("master", m) for m in sample]
+        ids = await create_documents("master", _SEED_DUMPS)
+        _invalidate_masters_cache()
         return {"inserted": len(ids), "ids": ids}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -139,40 +275,93 @@ class BookingOut(BaseModel):
     id: str
     status: str
 
-@app.post("/api/bookings", response_model=BookingOut, status_code=201)
-def create_booking(req: BookingRequest):
+@app.post("/api/bookings", responses={201: {"model": BookingOut}}, status_code=201)
+async def create_booking(req: BookingRequest):
     try:
-        # Create client first
+        # Allocate the client id up front so both writes can go out together
+        client_oid = ObjectId()
         client = Client(name=req.name, email=req.email)
-        client_id = create_document("client", client)
         # Create booking (service unknown at this stage)
         booking = Booking(
             master_id=req.master_id,
-            client_id=client_id,
+            client_id=str(client_oid),
             service_id="unknown",
             datetime_utc=req.datetime_utc,
             status="pending",
             notes=req.notes,
         )
-        booking_id = create_document("booking", booking)
-        return BookingOut(id=booking_id, status="pending")
+        results = await asyncio.gather(
+            create_document("client", {**client.model_dump(), "_id": client_oid}),
+            create_document("booking", booking),
+            return_exceptions=True,
+        )
+        errors = [r for r in results if isinstance(r, BaseException)]
+        if errors:
+            # Undo whichever insert landed so no booking points at a missing client
+            for collection, result in zip(("client", "booking"), results):
+                if not isinstance(result, BaseException):
+                    await delete_document(collection, result)
+            raise errors[0]
+        _, booking_id = results
+        return {"id": booking_id, "status": "pending"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Booking fields plus the timestamps added by create_document; Mongo
+# renders the string id itself (find projections take expressions on 4.4+,
+# see README; older servers fail the first fetch with a 500)
+_BOOKING_PROJECTION = {
+    **{name: 1 for name in Booking.model_fields},
+    "created_at": 1,
+    "updated_at": 1,
+    "_id": 0,
+    "id": {"$toString": "$_id"},
+}
+
+def _bson_default(obj):
+    """orjson fallback for BSON types: ObjectIds as plain strings, the rest via bson"""
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    return json_util.default(obj)
+
+async def _stream_json_array(first, cursor):
+    """Encode a prefetched document and the rest of the cursor as a JSON array"""
+    if first is None:
+        yield b"[]"
+        return
+    yield b"[" + orjson.dumps(first, default=_bson_default)
+    async for d in cursor:
+        yield b"," + orjson.dumps(d, default=_bson_default)
+    yield b"]"
+
 @app.get("/api/bookings")
-def list_bookings(master_id: Optional[str] = None, limit: int = Query(default=50, ge=1, le=200)):
+async def list_bookings(master_id: Optional[str] = None, limit: int = Query(default=50, ge=1, le=200)):
     try:
         q = {"master_id": master_id} if master_id else {}
-        docs = get_documents("booking", q, limit=limit)
-        # sanitize ids
-        for d in docs:
-            d["id"] = str(d.pop("_id", ""))
-        return docs
+        cursor = iter_documents("booking", q, limit=limit, projection=_BOOKING_PROJECTION)
+        # Run the query before the 200 goes out so connection and query
+        # errors still become a 500
+        try:
+            first = await cursor.next()
+        except StopAsyncIteration:
+            first = None
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
+    return StreamingResponse(_stream_json_array(first, cursor), media_type="application/json")
 
 
 if __name__ == "__main__":
+    # Production runs under gunicorn with one UvicornWorker per core (see
+    # README); WEB_CONCURRENCY > 1 gives the same pre-fork setup here.
     import uvicorn
     port = int(os.getenv("PORT", 8000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WEB_CONCURRENCY", 1))
+    uvicorn.run(
+        "main:app" if workers > 1 else app,
+        host="0.0.0.0",
+        port=port,
+        workers=workers,
+        loop="uvloop",
+        http="httptools",
+        log_level="warning",
+    )
@@ -4,10 +4,18 @@ Database Schemas for BeautyConnect
 Each Pydantic model represents a MongoDB collection.
 Collection name is the lowercase of the class name (e.g., Master -> "master").
 """
-from pydantic import BaseModel, Field, EmailStr, HttpUrl
-from typing import Optional, List, Literal
+from pydantic import BaseModel, Field, EmailStr, HttpUrl, TypeAdapter, field_validator
+from typing import Annotated, Optional, List, Literal
 from datetime import datetime
 
+# URL check applied only where avatars are ingested
+_http_url = TypeAdapter(HttpUrl)
+# Keep /schema publishing what HttpUrl / EmailStr did for the str fields
+_URL_SCHEMA = {"format": "uri", "minLength": 1, "maxLength": 2083}
+_EMAIL_SCHEMA = {"format": "email"}
+# Attached to the inner type so Optional[...] keeps it inside the string branch
+_UrlStr = Annotated[str, Field(json_schema_extra=_URL_SCHEMA)]
+
 # Core entities
 
 class Master(BaseModel):
@@ -16,16 +24,24 @@ class Master(BaseModel):
     phone: Optional[str] = Field(None, description="Contact phone number")
     city: Optional[str] = Field(None, description="City / location")
     bio: Optional[str] = Field(None, description="Short bio/description")
-    avatar: Optional[HttpUrl] = Field(None, description="Profile image URL")
+    avatar: Optional[_UrlStr] = Field(None, description="Profile image URL")
     skills: List[str] = Field(default_factory=list, description="List of skills/tags")
     rating: float = Field(0, ge=0, le=5, description="Average rating")
     reviews_count: int = Field(0, ge=0, description="Number of reviews")
 
+    @field_validator("avatar")
+    @classmethod
+    def validate_avatar(cls, v: Optional[str]) -> Optional[str]:
+        if v is None:
+            return v
+        return str(_http_url.validate_python(v))
+
 class Client(BaseModel):
+    # Built from already-validated input (BookingRequest), so plain strings
     name: str
-    email: EmailStr
+    email: str = Field(..., json_schema_extra=_EMAIL_SCHEMA)
     phone: Optional[str] = None
-    avatar: Optional[HttpUrl] = None
+    avatar: Optional[_UrlStr] = None
 
 class Service(BaseModel):
     title: str